@@ -7,14 +7,30 @@ Connects Arduino <-> Mininet <-> ONOS
 """
 
 import serial
+import os
+import secrets
 import subprocess
+import threading
+import queue
 import time
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from control_api import ControlAPI
 
 # ============ CONFIGURATION ============
 ARDUINO_PORT = '/dev/ttyACM0'  # Change if needed (ls /dev/ttyACM* to verify)
 ARDUINO_BAUD = 9600
+ARDUINO_READY_TIMEOUT = 5      # Max seconds to wait for READY after reset
+ARDUINO_SKIP_RESET = False     # Don't wait for READY; clear HUPCL so later opens don't reboot
 ONOS_IP = '192.168.16.111'  # Laptop IP
+STATE_QUERY_TIMEOUT = 0.5      # Seconds for each startup ovs-ofctl/tc query
+CONTROL_API_HOST = '127.0.0.1'  # Local control API (HTTP + WebSocket)
+CONTROL_API_PORT = 8765         # Set to None to disable
+CONTROL_API_QUEUE = 8           # Max API commands waiting (keeps the joystick responsive)
+# Clients must send this token (X-Bridge-Token header or ?token=...).
+# Set BRIDGE_API_TOKEN to fix it, otherwise a new one is printed at start-up
+CONTROL_API_TOKEN = os.environ.get('BRIDGE_API_TOKEN') or secrets.token_urlsafe(16)
 
 # ============ STATE VARIABLES ============
 h1_connected = True
@@ -22,6 +38,9 @@ h2_connected = True
 switch_congested = False
 selected_device = None  # 'h1', 'h2', 's1', 'both'
 last_temperature = 0.0  
+command_queue = queue.Queue()  # (source, message) from Arduino + control API
+api_slots = threading.Semaphore(CONTROL_API_QUEUE)  # Free places for API commands
+startup_start = None  # time.monotonic() when main() started
 
 # ============ NETWORK COMMANDS ============
 
@@ -294,33 +313,62 @@ def handle_temp(arduino, temp):
     if temp > 30:
         print("  ⚠ High temperature!")       
 
-# ============ ARDUINO INPUT ============
+# ============ ARDUINO SETUP ============
+
+def wait_for_ready(arduino, timeout):
+    """Block until the Arduino prints READY (or the deadline passes)
+    
+    Uses blocking reads with the remaining time as the serial timeout,
+    so we return as soon as the line arrives instead of polling.
+    """
+    deadline = time.monotonic() + timeout
+    saved_timeout = arduino.timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            arduino.timeout = remaining
+            msg = arduino.readline().decode('utf-8', errors='replace').strip()
+            if msg == "READY":
+                return True
+    finally:
+        arduino.timeout = saved_timeout
+
+def clear_hupcl(arduino):
+    """Stop the kernel dropping DTR on close (which resets the Arduino)"""
+    try:
+        import termios
+    except ImportError:
+        return  # Not POSIX, nothing to do
+    try:
+        attrs = termios.tcgetattr(arduino.fileno())
+        attrs[2] &= ~termios.HUPCL  # cflag
+        termios.tcsetattr(arduino.fileno(), termios.TCSANOW, attrs)
+    except (OSError, termios.error) as e:
+        print(f"⚠ Could not clear HUPCL: {e}")
 
 def setup_arduino():
     """Connect to Arduino and wait until ready"""
-    print("=== SDN Bridge Starting ===")
     print(f"Connecting to Arduino on {ARDUINO_PORT}...")
     
     try:
-        arduino = serial.Serial(ARDUINO_PORT, ARDUINO_BAUD, timeout=1)
-        time.sleep(2)  # Wait for Arduino reset
-        print("✓ Arduino connected!")
-        
-        # Wait for "READY" message from Arduino (optional)
-        timeout = time.time() + 5
-        while time.time() < timeout:
-            if arduino.in_waiting > 0:
-                msg = arduino.readline().decode('utf-8').strip()
-                if msg == "READY":
-                    print("✓ Arduino ready!")
-                    break
-        
-        # Initialize LEDs
-        # h1 and h2 ON (connected), switch green (normal)
-        arduino.write(b"LED1:GREEN\n")
-        arduino.write(b"LED2:GREEN\n")
-        arduino.write(b"LED3:GREEN\n")
-        print("✓ LEDs initialized")
+        if ARDUINO_SKIP_RESET:
+            # Linux raises DTR on open, so the board can still reboot on
+            # this open; clearing HUPCL keeps DTR up after we close, so the
+            # *next* open does not reset it. If it does reboot now, the
+            # READY line is handled in the main loop and the LEDs re-sent.
+            arduino = serial.Serial(ARDUINO_PORT, ARDUINO_BAUD, timeout=1)
+            clear_hupcl(arduino)
+            print("✓ Arduino connected (not waiting for reset)")
+        else:
+            arduino = serial.Serial(ARDUINO_PORT, ARDUINO_BAUD, timeout=1)
+            print("✓ Arduino connected!")
+            # Opening the port resets the board, it prints READY when done
+            if wait_for_ready(arduino, ARDUINO_READY_TIMEOUT):
+                print("✓ Arduino ready!")
+            else:
+                print(f"⚠ No READY after {ARDUINO_READY_TIMEOUT}s, continuing anyway")
         
         return arduino
         
@@ -335,77 +383,279 @@ def setup_arduino():
         print(f"✗ Unexpected error: {e}")
         sys.exit(1)
 
-def arduino_loop(arduino):
-    """Main loop: read commands from Arduino"""
+def init_leds(arduino):
+    """Set all three LEDs from the current state in a single write"""
+    led1 = b"LED1:GREEN\n" if h1_connected else b"LED1:RED\n"
+    led2 = b"LED2:GREEN\n" if h2_connected else b"LED2:RED\n"
+    if not h1_connected and not h2_connected:
+        led3 = b"LED3:RED\n"
+    elif switch_congested:
+        led3 = b"LED3:BLUE\n"
+    else:
+        led3 = b"LED3:GREEN\n"
+    arduino.write(led1 + led2 + led3)
+    print("✓ LEDs initialized")
+
+# ============ STARTUP TASKS ============
+
+def run_state_query(cmd):
+    """Run a read-only query for startup, return stdout or None on failure
+    
+    Uses `sudo -n` so a password prompt can't block startup, and a
+    timeout so a hung command can't either.
+    """
+    try:
+        result = subprocess.run(
+            ["sudo", "-n"] + cmd,
+            capture_output=True,
+            timeout=STATE_QUERY_TIMEOUT
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.decode()
+
+def read_port_states():
+    """Return {port_name: is_up} for the ports of s1, None if unknown"""
+    output = run_state_query(["ovs-ofctl", "-O", "OpenFlow13", "show", "s1"])
+    if output is None:
+        return None
+    
+    # Port block looks like:
+    #  1(s1-eth1): addr:...
+    #      config:     PORT_DOWN
+    states = {}
+    port_name = None
+    for line in output.splitlines():
+        if "(" in line and "): addr:" in line:
+            port_name = line.split("(", 1)[1].split(")", 1)[0]
+        elif port_name and "config:" in line:
+            states[port_name] = "PORT_DOWN" not in line
+            port_name = None
+    return states
+
+def read_congestion():
+    """Return True if the tbf qdisc is installed on s1-eth1, None if unknown"""
+    output = run_state_query(["tc", "qdisc", "show", "dev", "s1-eth1"])
+    if output is None:
+        return None
+    return "tbf" in output
+
+def reconcile_ovs_state():
+    """Read the real link/congestion state instead of assuming defaults
+    
+    Anything that can't be read keeps its default value.
+    """
+    global h1_connected, h2_connected, switch_congested
+    
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        ports_task = pool.submit(read_port_states)
+        congested_task = pool.submit(read_congestion)
+    ports = ports_task.result()
+    congested = congested_task.result()
+    
+    if ports is not None:
+        h1_connected = ports.get("s1-eth1", h1_connected)
+        h2_connected = ports.get("s1-eth2", h2_connected)
+    if congested is not None:
+        switch_congested = congested
+    
+    if ports is None and congested is None:
+        print("⚠ Could not read OVS state (sudo -n ovs-ofctl/tc), assuming defaults")
+    elif ports is None or congested is None:
+        print("⚠ OVS state partly reconciled, rest assumes defaults")
+    else:
+        print("✓ OVS state reconciled")
+
+# ============ ARDUINO INPUT ============
+
+def get_state():
+    """Snapshot of the bridge state (used by the control API)"""
+    return {
+        "selected": selected_device,
+        "h1_connected": h1_connected,
+        "h2_connected": h2_connected,
+        "switch_congested": switch_congested,
+        "temperature": last_temperature,
+    }
+
+def process_message(arduino, mensaje, source="Arduino"):
+    """Dispatch one message (from the Arduino or the control API)"""
+    print(f"[{source}] {mensaje}")
+    
+    if mensaje == "JOY_UP":
+        handle_joystick_up(arduino)
+        
+    elif mensaje == "JOY_LEFT":
+        handle_joystick_left(arduino)
+        
+    elif mensaje == "JOY_RIGHT":
+        handle_joystick_right(arduino)
+        
+    elif mensaje == "JOY_DOWN":
+        handle_joystick_down(arduino)
+        
+    elif mensaje == "BUTTON":
+        handle_button(arduino)
+        
+    elif mensaje.startswith("TEMP:"):
+        try:
+            temp = float(mensaje.split(":")[1])
+            handle_temp(arduino, temp)
+        except ValueError:
+            print(f"  ✗ Error parsing temperature: {mensaje}")
+    
+    elif mensaje == "READY":
+        # The board rebooted and lost its LED state: send it again
+        print("  ⚠ Arduino restarted, re-sending LED state")
+        init_leds(arduino)
+    
+    else:
+        print(f"  ? Unknown command: {mensaje}")
+
+def serial_reader(arduino, commands, stop):
+    """Background thread: push Arduino lines into the command queue"""
+    while not stop.is_set():
+        try:
+            line = arduino.readline()
+        except (serial.SerialException, OSError) as e:
+            if not stop.is_set():
+                print(f"✗ Serial read error: {e}")
+                # Tell the main loop the Arduino is gone
+                commands.put(("serial", None))
+            break
+        
+        mensaje = line.decode('utf-8', errors='replace').strip()
+        if mensaje:
+            commands.put(("Arduino", mensaje))
+
+def submit_api_commands(mensajes):
+    """Queue a batch of control API commands, all or nothing
+    
+    At most CONTROL_API_QUEUE API commands wait at a time, so a flood
+    of requests can't bury joystick input; raises queue.Full instead.
+    """
+    taken = 0
+    for _ in mensajes:
+        if not api_slots.acquire(blocking=False):
+            for _ in range(taken):
+                api_slots.release()
+            raise queue.Full
+        taken += 1
+    
+    for mensaje in mensajes:
+        command_queue.put(("API", mensaje))
+
+def arduino_loop(arduino, api=None):
+    """Main loop: handle commands from the Arduino and the control API
+    
+    Both sources feed the same queue, and all handlers run on this
+    thread, so state and LED writes are never touched concurrently.
+    """
     print("\n=== Bridge Running ===")
     print("Waiting for Arduino commands...\n")
     
+    stop = threading.Event()
+    reader = threading.Thread(target=serial_reader, args=(arduino, command_queue, stop), daemon=True)
+    reader.start()
+    
+    if api is not None:
+        try:
+            api.start()
+        except OSError as e:
+            # Keep serving the joystick even if the API port is taken
+            print(f"⚠ Control API disabled, cannot listen on "
+                  f"{api.host}:{api.port}: {e}")
+            api = None
+    
+    last_state = get_state()
+    
+    # Startup time: until the reader thread and API are up and the
+    # loop can take the first command from the queue
+    if startup_start is not None:
+        elapsed = (time.monotonic() - startup_start) * 1000
+        print(f"⏱ Ready to handle events in {elapsed:.0f} ms\n")
+    
     try:
         while True:
-            if arduino.in_waiting > 0:
-                mensaje = arduino.readline().decode('utf-8').strip()
-                
-                if not mensaje or mensaje == "READY":
-                    continue
-                
-                print(f"[Arduino] {mensaje}")
-                
-                # Process message
-                if mensaje == "JOY_UP":
-                    handle_joystick_up(arduino)
-                    
-                elif mensaje == "JOY_LEFT":
-                    handle_joystick_left(arduino)
-                    
-                elif mensaje == "JOY_RIGHT":
-                    handle_joystick_right(arduino)
-                    
-                elif mensaje == "JOY_DOWN":
-                    handle_joystick_down(arduino)
-                    
-                elif mensaje == "BUTTON":
-                    handle_button(arduino)
-                    
-                elif mensaje.startswith("TEMP:"):
-                    try:
-                        temp = float(mensaje.split(":")[1])
-                        handle_temp(arduino, temp)
-                    except ValueError:
-                        print(f"  ✗ Error parsing temperature: {mensaje}")
-                
-                else:
-                    print(f"  ? Unknown command: {mensaje}")
+            try:
+                source, mensaje = command_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            
+            if mensaje is None:
+                print("\n✗ Lost connection to the Arduino")
+                break
             
-            time.sleep(0.01)
+            try:
+                process_message(arduino, mensaje, source)
+            except (serial.SerialException, OSError) as e:
+                print(f"\n✗ Lost connection to the Arduino: {e}")
+                break
+            finally:
+                if source == "API":
+                    api_slots.release()
+            
+            # Push state changes to subscribers
+            state = get_state()
+            if api is not None and state != last_state:
+                api.publish(state)
+            last_state = state
             
     except KeyboardInterrupt:
-        print("\n\n=== Bridge Stopped ===")
+        pass
+    
+    print("\n\n=== Bridge Stopped ===")
+    stop.set()
+    if api is not None:
+        api.stop()
+    try:
         # Cleanup: reset LEDs to initial state
         arduino.write(b"LED1:GREEN\n")
         arduino.write(b"LED2:GREEN\n")
         arduino.write(b"LED3:GREEN\n")
         arduino.close()
+    except (serial.SerialException, OSError):
+        pass
         print("Arduino disconnected. Goodbye!")
 
 # ============ MAIN ============
 
 def main():
+    global startup_start
+    startup_start = time.monotonic()
+    
     print("="*60)
     print("SDN Bridge - PRODUCTION MODE (With Arduino)")
     print("="*60)
     print()
+    print("=== SDN Bridge Starting ===")
     
-    # Connect Arduino
-    arduino = setup_arduino()
+    # Open the Arduino and read the OVS state in parallel
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        arduino_task = pool.submit(setup_arduino)
+        ovs_task = pool.submit(reconcile_ovs_state)
+        arduino = arduino_task.result()
+        ovs_task.result()
+    init_leds(arduino)
     
     # Initial state
     print("\nInitial state:")
-    print("  h1: CONNECTED (LED ON)")
-    print("  h2: CONNECTED (LED ON)")
-    print("  Switch: NORMAL (RGB LED Green)")
+    print(f"  h1: {'CONNECTED (LED ON)' if h1_connected else 'DISCONNECTED (LED OFF)'}")
+    print(f"  h2: {'CONNECTED (LED ON)' if h2_connected else 'DISCONNECTED (LED OFF)'}")
+    print(f"  Switch: {'CONGESTED' if switch_congested else 'NORMAL'}")
+    
+    # Local control API (same command pipeline as the joystick)
+    api = None
+    if CONTROL_API_PORT is not None:
+        api = ControlAPI(submit_api_commands, get_state, CONTROL_API_HOST, CONTROL_API_PORT,
+                         token=CONTROL_API_TOKEN)
+        if 'BRIDGE_API_TOKEN' not in os.environ:
+            print(f"\nControl API token: {CONTROL_API_TOKEN}")
     
     # Start loop
-    arduino_loop(arduino)
+    arduino_loop(arduino, api)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Local Control API for the SDN Bridge
+Group 5 - Advanced Computer Networks
+
+Lets scripts and dashboards drive the bridge without the joystick:
+- HTTP:      POST commands, GET the current state
+- WebSocket: send commands and receive state-change events (no polling)
+
+Commands are translated into the same messages the Arduino sends
+("JOY_LEFT", "BUTTON", ...) and handed to the bridge's command queue,
+so they go through exactly the same handlers as the serial input.
+
+Only uses the Python standard library.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import queue
+import socket
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# ============ COMMANDS ============
+
+# Device name -> joystick message that selects it
+SELECT_MESSAGES = {
+    's1': 'JOY_UP',
+    'h1': 'JOY_LEFT',
+    'h2': 'JOY_RIGHT',
+    'both': 'JOY_DOWN',
+}
+
+# Raw messages accepted as-is (same as the Arduino protocol)
+RAW_MESSAGES = {'JOY_UP', 'JOY_DOWN', 'JOY_LEFT', 'JOY_RIGHT', 'BUTTON'}
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# Largest HTTP body / WebSocket message accepted (bytes)
+MAX_MESSAGE_SIZE = 64 * 1024
+
+# Events buffered per WebSocket client; the oldest are dropped if it
+# doesn't keep up (each event is a full state snapshot)
+EVENT_QUEUE_SIZE = 32
+
+# Browser origins allowed to use the API (any port)
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+
+
+def translate_command(text):
+    """Translate an API command into an Arduino message (or None if invalid)
+
+    Accepted forms:
+    - "select h1" / "SELECT:h1" → JOY_LEFT (also h2, s1, both)
+    - "toggle"                  → BUTTON
+    - raw messages: JOY_UP, JOY_DOWN, JOY_LEFT, JOY_RIGHT, BUTTON
+    """
+    text = text.strip()
+    if not text:
+        return None
+
+    if text in RAW_MESSAGES:
+        return text
+
+    parts = text.replace(":", " ").split()
+    action = parts[0].lower()
+
+    if action == 'toggle' and len(parts) == 1:
+        return 'BUTTON'
+
+    if action == 'select' and len(parts) == 2:
+        return SELECT_MESSAGES.get(parts[1].lower())
+
+    return None
+
+
+def offer(events, item):
+    """Put on a bounded queue, dropping the oldest item if it is full"""
+    while True:
+        try:
+            events.put_nowait(item)
+            return
+        except queue.Full:
+            try:
+                events.get_nowait()
+            except queue.Empty:
+                pass
+
+
+def is_local_origin(origin):
+    """True if a browser Origin header points at this machine"""
+    try:
+        return urlsplit(origin).hostname in LOCAL_HOSTS
+    except ValueError:
+        return False
+
+
+def parse_commands(body):
+    """Parse a request body into a list of command strings
+
+    The body can be plain text (one command per line) or JSON:
+    {"command": "..."}, {"commands": [...]} or a JSON list.
+    Raises ValueError if the body does not have one of these shapes.
+    """
+    text = body.decode('utf-8').strip()
+    if not text:
+        return []
+
+    if text[0] in '{[':
+        data = json.loads(text)
+        if isinstance(data, list):
+            return [str(c) for c in data]
+        if not isinstance(data, dict):
+            raise ValueError("expected a JSON object or list")
+        if 'commands' in data:
+            if not isinstance(data['commands'], list):
+                raise ValueError('"commands" must be a list')
+            return [str(c) for c in data['commands']]
+        if 'command' in data:
+            return [str(data['command'])]
+        raise ValueError('expected "command" or "commands"')
+
+    return text.splitlines()
+
+
+# ============ WEBSOCKET FRAMES ============
+
+def ws_accept_key(key):
+    """Compute Sec-WebSocket-Accept for a client key"""
+    digest = hashlib.sha1((key + WS_GUID).encode('ascii')).digest()
+    return base64.b64encode(digest).decode('ascii')
+
+
+def ws_encode_frame(payload, opcode=0x1):
+    """Build an unmasked (server → client) frame"""
+    header = bytes([0x80 | opcode])
+    length = len(payload)
+    if length < 126:
+        header += bytes([length])
+    elif length < 65536:
+        header += bytes([126]) + struct.pack('!H', length)
+    else:
+        header += bytes([127]) + struct.pack('!Q', length)
+    return header + payload
+
+
+def _recv_exact(rfile, n):
+    data = rfile.read(n)
+    if len(data) < n:
+        raise ConnectionError("WebSocket closed")
+    return data
+
+
+def ws_read_frame(rfile, max_size=MAX_MESSAGE_SIZE):
+    """Read one frame from the client, returns (fin, opcode, payload)
+
+    Raises ValueError if the frame is larger than max_size.
+    """
+    b1, b2 = _recv_exact(rfile, 2)
+    fin = bool(b1 & 0x80)
+    opcode = b1 & 0x0F
+    masked = b2 & 0x80
+    length = b2 & 0x7F
+
+    if length == 126:
+        length = struct.unpack('!H', _recv_exact(rfile, 2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', _recv_exact(rfile, 8))[0]
+
+    if length > max_size:
+        raise ValueError(f"frame too large ({length} bytes)")
+
+    mask = _recv_exact(rfile, 4) if masked else None
+    payload = _recv_exact(rfile, length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+    return fin, opcode, payload
+
+
+# ============ SERVER ============
+
+class ControlAPI:
+    """HTTP + WebSocket server feeding the bridge command queue
+
+    submit(messages) → queues a batch of messages, raises queue.Full if
+                       the bridge has no room for all of them
+    get_state()      → returns the current bridge state as a dict
+    publish(state)   → call from the bridge after each state change
+
+    If token is set, every request must send it, either in the
+    X-Bridge-Token header or as ?token=... (for browser WebSockets).
+    Requests from non-local browser origins are always refused.
+    """
+
+    def __init__(self, submit, get_state, host='127.0.0.1', port=8765, token=None):
+        self.submit = submit
+        self.get_state = get_state
+        self.host = host
+        self.port = port
+        self.token = token
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.server = None
+
+    def start(self):
+        """Start serving in a background thread"""
+        self.server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self.server.daemon_threads = True
+        # Use the real port (useful when port=0)
+        self.port = self.server.server_address[1]
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        print(f"✓ Control API on http://{self.host}:{self.port} (WebSocket: /events)")
+
+    def stop(self):
+        """Stop the server and disconnect subscribers"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        with self.lock:
+            for subscriber in self.subscribers:
+                offer(subscriber, None)
+
+    def publish(self, state):
+        """Push a state-change event to every WebSocket subscriber"""
+        event = json.dumps({"event": "state", "state": state})
+        with self.lock:
+            for subscriber in self.subscribers:
+                offer(subscriber, event)
+
+    def submit_commands(self, commands):
+        """Validate and submit commands, returns (accepted, rejected)
+
+        If any command is invalid the whole batch is rejected.
+        Raises queue.Full if the bridge is too busy to take the batch.
+        """
+        messages = []
+        rejected = []
+        for command in commands:
+            message = translate_command(command)
+            if message is None:
+                rejected.append(command)
+            else:
+                messages.append(message)
+
+        if rejected:
+            return 0, rejected
+
+        if messages:
+            self.submit(messages)
+
+        return len(messages), rejected
+
+    def _make_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; without this, Nagle +
+            # delayed ACK add ~40 ms to every reply on keep-alive connections
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                # Keep the bridge console readable
+                pass
+
+            def send_json(self, status, data):
+                body = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def check_access(self):
+                """Parse the URL and refuse foreign origins / bad tokens
+
+                Returns the request path, or None if a 403 was sent.
+                """
+                url = urlsplit(self.path)
+
+                origin = self.headers.get('Origin')
+                if origin is not None and not is_local_origin(origin):
+                    self.close_connection = True
+                    self.send_json(403, {"error": "origin not allowed"})
+                    return None
+
+                if api.token:
+                    token = self.headers.get('X-Bridge-Token')
+                    if token is None:
+                        token = parse_qs(url.query).get('token', [''])[0]
+                    if not hmac.compare_digest(token.encode('utf-8'), api.token.encode('utf-8')):
+                        self.close_connection = True
+                        self.send_json(403, {"error": "invalid token"})
+                        return None
+
+                return url.path
+
+            def do_GET(self):
+                path = self.check_access()
+                if path is None:
+                    return
+
+                if path == '/state':
+                    self.send_json(200, api.get_state())
+                elif path == '/events':
+                    self.handle_websocket()
+                else:
+                    self.send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                path = self.check_access()
+                if path is None:
+                    return
+
+                try:
+                    length = int(self.headers.get('Content-Length', 0))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_MESSAGE_SIZE:
+                    self.close_connection = True
+                    self.send_json(400, {"error": "invalid Content-Length"})
+                    return
+                body = self.rfile.read(length)
+
+                if path == '/command':
+                    try:
+                        commands = parse_commands(body)
+                    except ValueError as e:
+                        self.send_json(400, {"error": f"invalid body: {e}"})
+                        return
+                elif path == '/toggle':
+                    commands = ['toggle']
+                elif path.startswith('/select/'):
+                    commands = [f"select {unquote(path[len('/select/'):])}"]
+                else:
+                    self.send_json(404, {"error": "not found"})
+                    return
+
+                try:
+                    accepted, rejected = api.submit_commands(commands)
+                except queue.Full:
+                    self.send_json(503, {"error": "bridge busy, retry later"})
+                    return
+                if rejected:
+                    self.send_json(400, {"accepted": accepted, "rejected": rejected})
+                else:
+                    self.send_json(202, {"accepted": accepted})
+
+            def handle_websocket(self):
+                key = self.headers.get('Sec-WebSocket-Key')
+                if self.headers.get('Upgrade', '').lower() != 'websocket' or not key:
+                    self.send_json(400, {"error": "WebSocket upgrade required"})
+                    return
+
+                self.send_response(101, "Switching Protocols")
+                self.send_header("Upgrade", "websocket")
+                self.send_header("Connection", "Upgrade")
+                self.send_header("Sec-WebSocket-Accept", ws_accept_key(key))
+                self.end_headers()
+                self.wfile.flush()
+                self.close_connection = True
+
+                events = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+                send_lock = threading.Lock()
+
+                def send(payload, opcode=0x1):
+                    with send_lock:
+                        self.wfile.write(ws_encode_frame(payload, opcode))
+                        self.wfile.flush()
+
+                def send_error(data):
+                    send(json.dumps(dict(event="error", **data)).encode('utf-8'))
+
+                def writer():
+                    try:
+                        while True:
+                            event = events.get()
+                            if event is None:
+                                break
+                            send(event.encode('utf-8'))
+                    except OSError:
+                        pass
+
+                # Initial snapshot, then only changes. Both under the lock so
+                # no publish() can fall between the snapshot and subscribing
+                with api.lock:
+                    api.subscribers.add(events)
+                    offer(events, json.dumps({"event": "state", "state": api.get_state()}))
+                writer_thread = threading.Thread(target=writer, daemon=True)
+                writer_thread.start()
+
+                message = None  # Fragments of a text message, if any
+                try:
+                    while True:
+                        fin, opcode, payload = ws_read_frame(self.rfile)
+                        if opcode == 0x8:  # Close
+                            send(payload[:2], 0x8)
+                            break
+                        elif opcode == 0x9:  # Ping
+                            send(payload, 0xA)
+                            continue
+                        elif opcode == 0x1:  # Text (first or only frame)
+                            message = payload
+                        elif opcode == 0x0 and message is not None:  # Continuation
+                            message += payload
+                            if len(message) > MAX_MESSAGE_SIZE:
+                                raise ValueError("message too large")
+                        elif opcode == 0xA:  # Unsolicited pong
+                            continue
+                        else:
+                            send_error({"error": f"unsupported frame (opcode {opcode})"})
+                            message = None
+                            continue
+
+                        if not fin:
+                            continue
+
+                        # Complete text message: one command per line
+                        data, message = message, None
+                        try:
+                            commands = data.decode('utf-8').splitlines()
+                        except UnicodeDecodeError:
+                            send_error({"error": "text frame is not valid UTF-8"})
+                            continue
+                        try:
+                            accepted, rejected = api.submit_commands(commands)
+                        except queue.Full:
+                            send_error({"error": "bridge busy, retry later"})
+                            continue
+                        if rejected:
+                            send_error({"rejected": rejected})
+                except ValueError:
+                    # Oversized frame/message: close with 1009 (message too big)
+                    try:
+                        send(struct.pack('!H', 1009), 0x8)
+                    except OSError:
+                        pass
+                except (ConnectionError, OSError, socket.timeout):
+                    pass
+                finally:
+                    with api.lock:
+                        api.subscribers.discard(events)
+                    offer(events, None)
+                    writer_thread.join(timeout=1)
+
+        return Handler
@@ -1,16 +1,33 @@
 #!/usr/bin/env python3
 """
 Test script for Mininet + ONOS integration on localhost
+
+Interactive (default):
+    python3 test_onos_locally.py
+
+Headless probe (concurrent health + latency check, JSON report, exit code):
+    python3 test_onos_locally.py --probe [--url URL] [--samples N] [--max-p95 MS]
+                                 [--baseline report.json] [--output report.json]
+    python3 test_onos_locally.py --probe --stub   # against a built-in stub ONOS
 """
 
+import argparse
 import requests
 import subprocess
+import sys
+import threading
 import time
 import json
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ONOS_URL = "http://127.0.0.1:8181/onos/v1"
+REQUIRED_APPS = ['org.onosproject.openflow', 'org.onosproject.fwd']
+PROBE_ENDPOINTS = ['devices', 'hosts', 'links', 'flows', 'applications']
 
 class ONOSTest:
-    def __init__(self):
-        self.base_url = "http://127.0.0.1:8181/onos/v1"
+    def __init__(self, base_url=ONOS_URL):
+        self.base_url = base_url
         self.auth = ('onos', 'rocks')
     
     def test_connection(self):
@@ -37,7 +54,7 @@ class ONOSTest:
             response = requests.get(f"{self.base_url}/applications", auth=self.auth)
             apps = response.json()['applications']
             
-            required_apps = ['org.onosproject.openflow', 'org.onosproject.fwd']
+            required_apps = REQUIRED_APPS
             active_apps = [app['name'] for app in apps if app['state'] == 'ACTIVE']
             
             for app_name in required_apps:
@@ -122,6 +139,203 @@ def connectivity_test():
     print("  h2 -> h1")
     print("  *** Results: 0% dropped (2/2 received)")
 
+# ============ HEADLESS PROBE ============
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))  # ceil
+    return ordered[int(rank) - 1]
+
+def get_list(body, key):
+    """Return body[key] if body is a dict and that is a list, else None"""
+    if isinstance(body, dict) and isinstance(body.get(key), list):
+        return body[key]
+    return None
+
+class ONOSProbe:
+    """Non-interactive health and latency probe
+
+    Every endpoint is sampled `samples` times; all requests run
+    concurrently, each worker thread with its own keep-alive session.
+    """
+
+    def __init__(self, base_url=ONOS_URL, samples=20, workers=8, timeout=5):
+        self.base_url = base_url
+        self.auth = ('onos', 'rocks')
+        self.samples = samples
+        self.workers = workers
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def session(self):
+        # requests.Session is not thread-safe, so one per worker thread
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+            self.local.session.auth = self.auth
+        return self.local.session
+
+    def fetch(self, endpoint):
+        """GET one endpoint, returns (endpoint, latency_ms, body or None, error)"""
+        start = time.perf_counter()
+        try:
+            response = self.session().get(f"{self.base_url}/{endpoint}", timeout=self.timeout)
+            latency = (time.perf_counter() - start) * 1000
+            if response.status_code != 200:
+                return endpoint, latency, None, f"HTTP {response.status_code}"
+            return endpoint, latency, response.json(), None
+        except Exception as e:
+            return endpoint, (time.perf_counter() - start) * 1000, None, str(e)
+
+    def run(self):
+        """Sample all endpoints concurrently and build the report dict"""
+        jobs = [endpoint for _ in range(self.samples) for endpoint in PROBE_ENDPOINTS]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            results = list(pool.map(self.fetch, jobs))
+
+        endpoints = {}
+        last_body = {}
+        for endpoint in PROBE_ENDPOINTS:
+            latencies = [r[1] for r in results if r[0] == endpoint and r[3] is None]
+            errors = [r[3] for r in results if r[0] == endpoint and r[3] is not None]
+            bodies = [r[2] for r in results if r[0] == endpoint and r[2] is not None]
+            if bodies:
+                last_body[endpoint] = bodies[-1]
+            endpoints[endpoint] = {
+                "samples": self.samples,
+                "errors": len(errors),
+                "first_error": errors[0] if errors else None,
+                "p50_ms": percentile(latencies, 50),
+                "p95_ms": percentile(latencies, 95),
+                "p99_ms": percentile(latencies, 99),
+                "max_ms": max(latencies) if latencies else None,
+            }
+
+        # Bodies we could fetch but not understand
+        malformed = []
+
+        apps = get_list(last_body.get('applications'), 'applications')
+        if apps is None or not all(isinstance(app, dict) for app in apps):
+            if 'applications' in last_body:
+                malformed.append('applications')
+            apps = []
+        active_apps = [app.get('name') for app in apps if app.get('state') == 'ACTIVE']
+
+        devices = get_list(last_body.get('devices'), 'devices')
+        if devices is None:
+            if 'devices' in last_body:
+                malformed.append('devices')
+            devices = []
+
+        return {
+            "url": self.base_url,
+            "timestamp": time.time(),
+            "endpoints": endpoints,
+            "apps": {app: app in active_apps for app in REQUIRED_APPS},
+            "devices": len(devices),
+            "malformed": malformed,
+        }
+
+def check_report(report, max_p95=None, baseline=None, tolerance=0.5, min_devices=1):
+    """Return a list of failure messages (empty means healthy)"""
+    failures = []
+
+    for endpoint, stats in report['endpoints'].items():
+        if stats['errors']:
+            failures.append(f"{endpoint}: {stats['errors']}/{stats['samples']} failed "
+                            f"({stats['first_error']})")
+            continue
+        if stats['p95_ms'] is None:
+            continue
+        if max_p95 is not None and stats['p95_ms'] > max_p95:
+            failures.append(f"{endpoint}: p95 {stats['p95_ms']:.1f} ms > {max_p95} ms")
+        if baseline:
+            base = baseline.get('endpoints', {}).get(endpoint, {}).get('p95_ms')
+            if base and stats['p95_ms'] > base * (1 + tolerance):
+                failures.append(f"{endpoint}: p95 {stats['p95_ms']:.1f} ms regressed "
+                                f"from {base:.1f} ms")
+
+    for endpoint in report['malformed']:
+        failures.append(f"{endpoint}: unexpected response format")
+
+    for app, active in report['apps'].items():
+        if not active:
+            failures.append(f"{app} is NOT active")
+
+    if report['devices'] < min_devices:
+        failures.append(f"only {report['devices']} devices connected (need {min_devices})")
+
+    return failures
+
+# ============ STUB ONOS ============
+
+STUB_DATA = {
+    'devices': {"devices": [{"id": "of:0000000000000001", "type": "SWITCH", "available": True}]},
+    'hosts': {"hosts": [
+        {"id": "00:00:00:00:00:01/None", "ipAddresses": ["10.0.0.1"],
+         "locations": [{"elementId": "of:0000000000000001", "port": "1"}]},
+        {"id": "00:00:00:00:00:02/None", "ipAddresses": ["10.0.0.2"],
+         "locations": [{"elementId": "of:0000000000000001", "port": "2"}]},
+    ]},
+    'links': {"links": []},
+    'flows': {"flows": []},
+    'applications': {"applications": [{"name": app, "state": "ACTIVE"} for app in REQUIRED_APPS]},
+}
+
+def start_stub_onos(port=0):
+    """Start a minimal ONOS REST stub in a background thread, returns its base URL"""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Otherwise Nagle + delayed ACK add ~40 ms to every keep-alive reply
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            endpoint = self.path.rstrip('/').rsplit('/', 1)[-1]
+            if self.path.startswith('/onos/v1/') and endpoint in STUB_DATA:
+                status, data = 200, STUB_DATA[endpoint]
+            else:
+                status, data = 404, {"error": "not found"}
+            body = json.dumps(data).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/onos/v1"
+
+def probe_main(args):
+    """Headless mode: print a JSON report, exit 1 on failure"""
+    url = start_stub_onos() if args.stub else args.url
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    report = ONOSProbe(url, args.samples, args.workers, args.timeout).run()
+    failures = check_report(report, args.max_p95, baseline, args.tolerance, args.min_devices)
+    report['failures'] = failures
+    report['ok'] = not failures
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    print(output)
+
+    return 0 if report['ok'] else 1
+
 def main():
     print("=" * 60)
     print("ONOS + Mininet Integration Test (Localhost)")
@@ -168,5 +382,32 @@ def main():
         print("⚠️  Some tests failed. Check the output above.")
     print("=" * 60)
 
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1, got {value}")
+    return number
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="ONOS + Mininet integration test")
+    parser.add_argument('--probe', action='store_true',
+                        help="headless concurrent health/latency probe (no prompts)")
+    parser.add_argument('--url', default=ONOS_URL, help="ONOS REST base URL")
+    parser.add_argument('--stub', action='store_true', help="probe a built-in stub ONOS")
+    parser.add_argument('--samples', type=positive_int, default=20, help="requests per endpoint")
+    parser.add_argument('--workers', type=positive_int, default=8, help="concurrent requests")
+    parser.add_argument('--timeout', type=float, default=5, help="per-request timeout (s)")
+    parser.add_argument('--max-p95', type=float, help="fail if any endpoint p95 exceeds this (ms)")
+    parser.add_argument('--baseline', help="previous JSON report to compare p95 against")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="allowed p95 increase over baseline (0.5 = +50%%)")
+    parser.add_argument('--min-devices', type=int, default=1,
+                        help="fail if fewer devices are connected (0 to disable)")
+    parser.add_argument('--output', help="also write the JSON report to this file")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.probe:
+        sys.exit(probe_main(args))
     main()